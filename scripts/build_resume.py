@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
+import importlib.util
 import json
 import os
 import shutil
@@ -9,16 +11,22 @@ from pathlib import Path
 
 try:
     import chevron  # Mustache renderer
+    from chevron.tokenizer import tokenize
 except ImportError:
     print("Missing dependency: chevron. Please run: pip install -r requirements.txt", file=sys.stderr)
     sys.exit(1)
 
 try:
-    import jsonschema
+    import fastjsonschema  # Code-generating JSON schema validator
 except ImportError:
-    print("Missing dependency: jsonschema. Please run: pip install -r requirements.txt", file=sys.stderr)
+    print("Missing dependency: fastjsonschema. Please run: pip install -r requirements.txt", file=sys.stderr)
     sys.exit(1)
 
+try:
+    import orjson  # Optional: faster JSON parsing
+except ImportError:
+    orjson = None
+
 ROOT = Path(__file__).resolve().parents[1]
 LATEX_TEMPLATE_DIR = ROOT / "latex-template"
 SECTIONS_DIR = LATEX_TEMPLATE_DIR / "sections"
@@ -26,102 +34,142 @@ CONTEXT_DIR = ROOT / "about-me"
 SCHEMA_PATH = ROOT / "context" / "protocol.schema.json"
 OUTPUT_DIR = ROOT / "output"
 
+# Map section -> template file
+SECTION_TEMPLATES = {
+    "heading": SECTIONS_DIR / "heading.tex",
+    "experience": SECTIONS_DIR / "experience.tex",
+    "projects": SECTIONS_DIR / "projects.tex",
+    "skills": SECTIONS_DIR / "skills.tex",
+    "education": SECTIONS_DIR / "education.tex",
+}
+
+# Generated validator modules, keyed by schema content and generator version
+SCHEMA_CACHE_DIR = ROOT / ".build" / "schema-cache"
+
+HAS_LATEXMK = shutil.which("latexmk") is not None
+
+# latexmk flag selecting each supported TeX engine
+LATEXMK_ENGINE_FLAGS = {
+    "pdflatex": "-pdf",
+    "xelatex": "-xelatex",
+    "lualatex": "-lualatex",
+}
+
+# Escape LaTeX special characters in a single pass. Each input character is
+# mapped once, so backslashes and braces inserted by a replacement are never
+# escaped again.
+_LATEX_TRANS = str.maketrans({
+    '\\': '\\textbackslash{}',
+    '$': '\\$',
+    '%': '\\%',
+    '&': '\\&',
+    '#': '\\#',
+    '_': '\\_',
+    '{': '\\{',
+    '}': '\\}',
+    '^': '\\textasciicircum{}',
+    '~': '\\textasciitilde{}',
+})
+
+# Per-section list fields joined into a comma-separated display field
+_JOIN_FIELDS = {
+    "skills": [
+        ("languages", "languages_display"),
+        ("technologies", "technologies_display"),
+        ("concepts", "concepts_display"),
+    ],
+    "projects": [("tech", "tech_display")],
+    "education": [("relevant_coursework", "coursework_display")],
+}
+# Per-section string lists that need LaTeX escaping
+_ESCAPE_FIELDS = {
+    "projects": ["bullets"],
+    "experience": ["bullets"],
+}
+
+# Compiled schema validators keyed by schema path
+_VALIDATOR_CACHE = {}
+# Tokenized Mustache templates keyed by (template path, mtime)
+_TEMPLATE_CACHE = {}
+
 
 def load_json(path: Path):
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_bytes())
+
+
+def load_schema_validator(schema_path: Path):
+    # Generate the validator source once per schema version and import it on
+    # later runs, so the schema is only compiled when it changes
+    schema_bytes = schema_path.read_bytes()
+    digest = hashlib.sha256(
+        fastjsonschema.VERSION.encode() + b"\0" + schema_bytes).hexdigest()
+    module_path = SCHEMA_CACHE_DIR / f"validator_{digest}.py"
+    if not module_path.exists():
+        code = fastjsonschema.compile_to_code(json.loads(schema_bytes))
+        ensure_dir(module_path.parent)
+        tmp_path = module_path.with_suffix(".tmp")
+        tmp_path.write_text(code, encoding="utf-8")
+        os.replace(tmp_path, module_path)
+    spec = importlib.util.spec_from_file_location(
+        f"_schema_validator_{digest[:16]}", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.validate
 
 
 def validate_payload(payload: dict, schema_path: Path):
-    schema = load_json(schema_path)
-    jsonschema.validate(instance=payload, schema=schema)
+    validator = _VALIDATOR_CACHE.get(schema_path)
+    if validator is None:
+        validator = load_schema_validator(schema_path)
+        _VALIDATOR_CACHE[schema_path] = validator
+    validator(payload)
 
 
 def join_display_fields(payload: dict) -> dict:
-    # Mutates copies with *_display fields required by templates
-    data = json.loads(json.dumps(payload))  # deep copy
-
-    # Helper function to handle LaTeX special characters
-    def handle_latex_chars(text):
-        if not isinstance(text, str):
-            return text
-        # Escape LaTeX special characters (order matters - backslash first!)
-        replacements = [
-            ('\\', '\\textbackslash{}'),
-            ('$', '\\$'),
-            ('%', '\\%'),
-            ('&', '\\&'),
-            ('#', '\\#'),
-            ('_', '\\_'),
-            ('{', '\\{'),
-            ('}', '\\}'),
-            ('^', '\\textasciicircum{}'),
-            ('~', '\\textasciitilde{}')
-        ]
-        for char, replacement in replacements:
-            text = text.replace(char, replacement)
-        return text
-
-    # Helper function to handle list items
-    def handle_list(items):
-        if not isinstance(items, list):
-            return items
-        return [handle_latex_chars(item) for item in items]
-
-    # skills
-    skills = data.get("skills") or {}
-    if isinstance(skills.get("languages"), list):
-        skills["languages_display"] = ", ".join(
-            skills["languages"]) if skills["languages"] else ""
-    if isinstance(skills.get("technologies"), list):
-        skills["technologies_display"] = ", ".join(
-            skills["technologies"]) if skills["technologies"] else ""
-    if isinstance(skills.get("concepts"), list):
-        skills["concepts_display"] = ", ".join(
-            skills["concepts"]) if skills["concepts"] else ""
-    data["skills"] = skills
-
-    # projects
-    projects = data.get("projects") or []
-    for p in projects:
-        if isinstance(p.get("tech"), list):
-            p["tech_display"] = ", ".join(p["tech"]) if p["tech"] else ""
-        if isinstance(p.get("bullets"), list):
-            p["bullets"] = handle_list(p["bullets"])
-    data["projects"] = projects
-
-    # experience
-    experience = data.get("experience") or []
-    for e in experience:
-        if isinstance(e.get("bullets"), list):
-            e["bullets"] = handle_list(e["bullets"])
-    data["experience"] = experience
-
-    # education
-    education = data.get("education") or []
-    for e in education:
-        if isinstance(e.get("relevant_coursework"), list):
-            e["coursework_display"] = ", ".join(
-                e["relevant_coursework"]) if e["relevant_coursework"] else ""
-    data["education"] = education
+    # Adds *_display fields required by templates. Only the containers that
+    # get mutated are copied; untouched branches are shared with the payload.
+    data = dict(payload)
+
+    # Join list fields into their display field and LaTeX-escape string lists
+    # in a single walk over each item
+    def handle_item(section, item):
+        item = dict(item)
+        for field, display_field in _JOIN_FIELDS.get(section, ()):
+            values = item.get(field)
+            if isinstance(values, list):
+                item[display_field] = ", ".join(values)
+        for field in _ESCAPE_FIELDS.get(section, ()):
+            values = item.get(field)
+            if isinstance(values, list):
+                item[field] = [v.translate(_LATEX_TRANS) if isinstance(v, str) else v
+                               for v in values]
+        return item
+
+    data["skills"] = handle_item("skills", payload.get("skills") or {})
+    for section in ("projects", "experience", "education"):
+        data[section] = [handle_item(section, item)
+                         for item in payload.get(section) or []]
 
     return data
 
 
+def load_template(template_path: Path) -> list:
+    key = (template_path, template_path.stat().st_mtime_ns)
+    tokens = _TEMPLATE_CACHE.get(key)
+    if tokens is None:
+        tokens = list(tokenize(template_path.read_text(encoding="utf-8")))
+        _TEMPLATE_CACHE[key] = tokens
+    return tokens
+
+
 def ensure_dir(p: Path):
     p.mkdir(parents=True, exist_ok=True)
 
 
 def render_sections(data: dict, build_src: Path):
     ensure_dir(build_src)
-    # Map section -> template file
-    mapping = {
-        "heading": SECTIONS_DIR / "heading.tex",
-        "experience": SECTIONS_DIR / "experience.tex",
-        "projects": SECTIONS_DIR / "projects.tex",
-        "skills": SECTIONS_DIR / "skills.tex",
-        "education": SECTIONS_DIR / "education.tex",
-    }
 
     # Prepare Mustache contexts per section
     ctx_heading = data.get("personal_info", {})
@@ -138,50 +186,67 @@ def render_sections(data: dict, build_src: Path):
         "education": ctx_education,
     }
 
-    for name, template_path in mapping.items():
-        with template_path.open("r", encoding="utf-8") as f:
-            rendered = chevron.render(f, contexts[name])
+    for name, template_path in SECTION_TEMPLATES.items():
+        rendered = chevron.render(load_template(template_path), contexts[name])
         # Write to build/src with names expected by resume.tex
-        out_name = "src/heading.tex" if name == "heading" else f"src/{name}.tex"
-        out_path = build_src.parent / out_name
-        ensure_dir(out_path.parent)
-        with out_path.open("w", encoding="utf-8") as wf:
+        with (build_src / template_path.name).open("w", encoding="utf-8") as wf:
             wf.write(rendered)
 
 
 def copy_template_static(build_dir: Path):
-    # Copy the entire template folder, then our rendered src files overwrite
-    if build_dir.exists():
-        shutil.rmtree(build_dir)
-    shutil.copytree(LATEX_TEMPLATE_DIR, build_dir)
-
-
-def compile_pdf(build_dir: Path, output_path: Path):
-    # Prefer latexmk
+    # Sync the template folder into the build dir, copying only new or changed
+    # files. Existing build artifacts (aux, fdb_latexmk, rendered src) are kept
+    # so latexmk can rebuild incrementally.
+    for src in LATEX_TEMPLATE_DIR.rglob("*"):
+        if not src.is_file():
+            continue
+        dst = build_dir / src.relative_to(LATEX_TEMPLATE_DIR)
+        src_stat = src.stat()
+        try:
+            dst_stat = dst.stat()
+            if (dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+                    and dst_stat.st_size == src_stat.st_size):
+                continue
+        except FileNotFoundError:
+            ensure_dir(dst.parent)
+        shutil.copy2(src, dst)
+
+
+def compile_pdf(build_dir: Path, output_path: Path, engine: str = "pdflatex"):
+    # Prefer latexmk; -recorder keeps its file database accurate across runs
     entry = build_dir / "resume.tex"
-    cmd_latexmk = ["latexmk", "-pdf", "-interaction=nonstopmode", str(entry)]
-    cmd_pdflatex = ["pdflatex", "-interaction=nonstopmode", str(entry)]
-    try:
-        subprocess.run(cmd_latexmk, cwd=build_dir, check=True,
-                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        # Fallback to running pdflatex twice for references
-        subprocess.run(cmd_pdflatex, cwd=build_dir, check=True)
+    cmd_latexmk = ["latexmk", LATEXMK_ENGINE_FLAGS[engine], "-recorder",
+                   "-interaction=nonstopmode", "-halt-on-error", str(entry)]
+    cmd_pdflatex = [engine, "-interaction=nonstopmode", str(entry)]
+    if HAS_LATEXMK:
+        result = subprocess.run(cmd_latexmk, cwd=build_dir,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        if result.returncode != 0:
+            sys.stderr.write(result.stdout.decode("utf-8", errors="replace"))
+            raise subprocess.CalledProcessError(result.returncode, cmd_latexmk)
+    else:
+        # Fallback to pdflatex, with a second pass only when LaTeX asks for one
         subprocess.run(cmd_pdflatex, cwd=build_dir, check=True)
+        log = (build_dir / "resume.log").read_text(encoding="utf-8", errors="replace")
+        if "Rerun to get" in log:
+            subprocess.run(cmd_pdflatex, cwd=build_dir, check=True)
 
     produced = build_dir / "resume.pdf"
     ensure_dir(output_path.parent)
-    shutil.copy2(produced, output_path)
+    shutil.copyfile(produced, output_path)
 
 
-def main():
+def main(argv: list = None):
     parser = argparse.ArgumentParser(
         description="Build resume PDF from JSON using LaTeX templates")
     parser.add_argument(
         "json", type=str, help="Path to versioned JSON (adhering to protocol.schema.json)")
     parser.add_argument(
         "--out", type=str, default=str(OUTPUT_DIR / "resume.pdf"), help="Output PDF path")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--engine", choices=sorted(LATEXMK_ENGINE_FLAGS), default="pdflatex",
+        help="TeX engine (use xelatex/lualatex for templates with Unicode fonts)")
+    args = parser.parse_args(argv)
 
     payload = load_json(Path(args.json))
     # Optionally support versioning in the input
@@ -202,7 +267,7 @@ def main():
 
     # Compile
     output_path = Path(args.out)
-    compile_pdf(build_dir, output_path)
+    compile_pdf(build_dir, output_path, args.engine)
     print(f"Written: {output_path}")
 
 
@@ -1,17 +1,31 @@
 #!/usr/bin/env python3
+import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson  # Optional: faster JSON parsing/serialization
+except ImportError:
+    orjson = None
+
+ROOT = Path(__file__).resolve().parents[1]
+
 
 def load_json(path: Path) -> dict:
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_bytes())
 
 
-def main():
-    # Get the root directory
-    root = Path(__file__).resolve().parents[1]
-    about_me_dir = root / 'about-me'
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        description="Merge the about-me JSON files into optimized_resume.json")
+    parser.add_argument(
+        "--pretty", action="store_true", help="Indent the output for human reading")
+    args = parser.parse_args(argv)
+
+    about_me_dir = ROOT / 'about-me'
 
     # Load all JSON files
     combined = {}
@@ -23,23 +37,38 @@ def main():
         'skills.json': 'skills'
     }
 
-    for filename, key in json_files.items():
-        file_path = about_me_dir / filename
-        if file_path.exists():
-            data = load_json(file_path)
-            # Handle nested arrays (like in projects.json and experience.json)
-            if isinstance(data, dict) and key in data:
-                combined[key] = data[key]
-            # For arrays (education, experience, projects), ensure we have a list
-            elif key in ['education', 'experience', 'projects']:
-                combined[key] = data if isinstance(data, list) else [data]
-            else:
-                combined[key] = data
+    paths = [(about_me_dir / filename, key)
+             for filename, key in json_files.items()
+             if (about_me_dir / filename).exists()]
 
-    # Write the combined JSON
+    # Read the files concurrently; merge in the original order below
+    with ThreadPoolExecutor(max_workers=max(len(paths), 1)) as executor:
+        loaded = list(executor.map(lambda pk: load_json(pk[0]), paths))
+
+    for (_, key), data in zip(paths, loaded):
+        # Handle nested arrays (like in projects.json and experience.json)
+        if isinstance(data, dict) and key in data:
+            combined[key] = data[key]
+        # For arrays (education, experience, projects), ensure we have a list
+        elif key in ['education', 'experience', 'projects']:
+            combined[key] = data if isinstance(data, list) else [data]
+        else:
+            combined[key] = data
+
+    # Write the combined JSON (compact unless asked for a readable copy)
     output_path = about_me_dir / 'optimized_resume.json'
-    with output_path.open('w', encoding='utf-8') as f:
-        json.dump(combined, f, indent=2)
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE
+        if args.pretty:
+            option |= orjson.OPT_INDENT_2
+        output_path.write_bytes(orjson.dumps(combined, option=option))
+    else:
+        with output_path.open('w', encoding='utf-8') as f:
+            if args.pretty:
+                json.dump(combined, f, indent=2)
+            else:
+                json.dump(combined, f, separators=(',', ':'))
+            f.write('\n')
 
     print(f"Created combined resume at: {output_path}")
 
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Shared OpenAI helpers for the pipeline steps: client setup, job description
+truncation, rate limiting, retries with backoff, and the on-disk response cache.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import weakref
+from pathlib import Path
+from typing import Any, Dict
+
+try:
+    import openai
+except ImportError:
+    print("Missing dependency: openai. Please run: pip install -r requirements.txt", file=sys.stderr)
+    sys.exit(1)
+
+try:
+    from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+except ImportError:
+    print("Missing dependency: tenacity. Please run: pip install -r requirements.txt", file=sys.stderr)
+    sys.exit(1)
+
+try:
+    from aiolimiter import AsyncLimiter
+except ImportError:
+    print("Missing dependency: aiolimiter. Please run: pip install -r requirements.txt", file=sys.stderr)
+    sys.exit(1)
+
+try:
+    import tiktoken  # Optional: exact token counts for job description truncation
+except ImportError:
+    tiktoken = None
+
+
+# Maximum number of OpenAI requests in flight at once
+MAX_CONCURRENT_REQUESTS = 10
+
+# Request and token rate limits, matching the chat model's published quotas
+MAX_REQUESTS_PER_MINUTE = 500
+MAX_TOKENS_PER_MINUTE = 150_000
+
+# Longest wait between retries, including waits asked for by Retry-After
+MAX_RETRY_WAIT = 60
+
+# One request semaphore and pair of rate limiters per running event loop
+_REQUEST_SEMAPHORES = weakref.WeakKeyDictionary()
+_RATE_LIMITERS = weakref.WeakKeyDictionary()
+
+# On-disk cache of LLM responses keyed by request hash
+RESPONSE_CACHE_DIR = Path(os.getenv(
+    'XDG_CACHE_HOME', Path.home() / '.cache')) / 'resume-generator'
+# Disabled with --no-cache
+use_response_cache = True
+
+# Optional: HTTP/2 support for the OpenAI client
+HAS_H2 = importlib.util.find_spec("h2") is not None
+
+
+def setup_openai_client(api_key: str = None, use_async: bool = True):
+    """Setup an OpenAI client (async by default) with API key."""
+    if not api_key and not os.getenv('OPENAI_API_KEY'):
+        raise ValueError(
+            "OpenAI API key not provided. Set OPENAI_API_KEY environment variable or pass --api-key")
+    # Multiplex concurrent requests over one connection when h2 is installed
+    if use_async:
+        http_client = openai.DefaultAsyncHttpxClient(http2=True) if HAS_H2 else None
+        return openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
+    http_client = openai.DefaultHttpxClient(http2=True) if HAS_H2 else None
+    return openai.OpenAI(api_key=api_key, http_client=http_client)
+
+
+# Rough characters-per-token ratio used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+
+def truncate_job_description(job_description: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Truncate the job description to at most max_tokens tokens."""
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+            tokens = encoding.encode(job_description)
+            if len(tokens) <= max_tokens:
+                return job_description
+            return encoding.decode(tokens[:max_tokens])
+        except Exception:
+            # Unknown model or encoding files unavailable; estimate instead
+            pass
+    return job_description[:max_tokens * CHARS_PER_TOKEN]
+
+
+def prompt_cache_key(job_description: str) -> str:
+    """Route requests for the same job description to the same OpenAI prompt cache."""
+    return hashlib.sha256(job_description.encode('utf-8')).hexdigest()[:32]
+
+
+# Transient OpenAI errors worth retrying
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError,
+                    openai.APITimeoutError, openai.InternalServerError)
+
+_exponential_backoff = wait_random_exponential(min=1, max=MAX_RETRY_WAIT)
+
+
+def wait_for_retry_after(retry_state) -> float:
+    """Wait as long as the API's Retry-After header asks, else back off exponentially."""
+    response = getattr(retry_state.outcome.exception(), 'response', None)
+    if response is not None:
+        headers = response.headers
+        try:
+            if 'retry-after-ms' in headers:
+                return min(float(headers['retry-after-ms']) / 1000, MAX_RETRY_WAIT)
+            if 'retry-after' in headers:
+                return min(float(headers['retry-after']), MAX_RETRY_WAIT)
+        except ValueError:
+            pass
+    return _exponential_backoff(retry_state)
+
+
+# The retry policy for every OpenAI call in the pipeline; works on both
+# sync and async functions
+retry_transient_errors = retry(
+    wait=wait_for_retry_after, stop=stop_after_attempt(6),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS), reraise=True)
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """Rough token cost of a chat request: its prompt plus the completion budget."""
+    prompt_chars = sum(len(message.get('content') or '')
+                       for message in request.get('messages', []))
+    return prompt_chars // CHARS_PER_TOKEN + request.get('max_tokens', 0)
+
+
+def _request_limits():
+    """The running event loop's request semaphore, request limiter and token limiter."""
+    loop = asyncio.get_running_loop()
+    semaphore = _REQUEST_SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _REQUEST_SEMAPHORES[loop] = asyncio.Semaphore(
+            MAX_CONCURRENT_REQUESTS)
+    limiters = _RATE_LIMITERS.get(loop)
+    if limiters is None:
+        limiters = _RATE_LIMITERS[loop] = (
+            AsyncLimiter(MAX_REQUESTS_PER_MINUTE, 60),
+            AsyncLimiter(MAX_TOKENS_PER_MINUTE, 60))
+    return (semaphore, *limiters)
+
+
+@retry_transient_errors
+async def _chat_with_retry(client: openai.AsyncOpenAI, **kwargs):
+    """Create a chat completion within the rate limits, retrying transient API errors."""
+    semaphore, request_limiter, token_limiter = _request_limits()
+    async with semaphore, request_limiter:
+        await token_limiter.acquire(
+            min(estimate_request_tokens(kwargs), MAX_TOKENS_PER_MINUTE))
+        return await client.chat.completions.create(**kwargs)
+
+
+@retry_transient_errors
+async def create_embeddings(client: openai.AsyncOpenAI, **kwargs):
+    """Create embeddings within the request limits, retrying transient API errors.
+
+    The token limiter tracks the chat model's quota, so embeddings only take
+    a request slot.
+    """
+    semaphore, request_limiter, _ = _request_limits()
+    async with semaphore, request_limiter:
+        return await client.embeddings.create(**kwargs)
+
+
+@retry_transient_errors
+def create_chat_completion_sync(client: openai.OpenAI, **kwargs):
+    """Create a chat completion with a sync client, retrying transient API errors."""
+    return client.chat.completions.create(**kwargs)
+
+
+def is_cacheable(response, validate=None) -> bool:
+    """Whether a response is complete, not a refusal, and accepted by validate."""
+    choice = response.choices[0] if response.choices else None
+    if choice is None or choice.finish_reason != "stop" or choice.message.refusal:
+        return False
+    if validate is None:
+        return True
+    try:
+        return bool(validate(response))
+    except Exception:
+        return False
+
+
+async def create_chat_completion(client: openai.AsyncOpenAI, send=None, validate=None, **kwargs):
+    """Create a chat completion, limiting the number of concurrent requests.
+
+    Responses are cached on disk keyed by the request parameters, so rerunning
+    with the same inputs makes no API calls. Only complete responses are
+    cached, and only if validate (called with the response, typically parsing
+    its content) returns true without raising; anything else is fetched again
+    next run. send, if given, replaces the rate-limited API call (step 1 uses
+    it to queue requests in a batch).
+    """
+    cache_path = None
+    if use_response_cache:
+        key = hashlib.sha256(json.dumps(
+            kwargs, sort_keys=True).encode('utf-8')).hexdigest()
+        cache_path = RESPONSE_CACHE_DIR / f"{key}.json"
+        if cache_path.exists():
+            return openai.types.chat.ChatCompletion.model_validate_json(
+                cache_path.read_bytes())
+
+    if send is not None:
+        response = await send(**kwargs)
+    else:
+        response = await _chat_with_retry(client, **kwargs)
+
+    if cache_path is not None and is_cacheable(response, validate):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(response.model_dump_json(), encoding='utf-8')
+        os.replace(tmp_path, cache_path)
+
+    return response
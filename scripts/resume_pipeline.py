@@ -9,29 +9,78 @@ Orchestrates the 4-step resume optimization and generation process:
 """
 
 import argparse
+import contextlib
+import importlib
+import io
+import os
 import subprocess
 import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+def run_step(script_name: str, args: list, step_name: str, use_subprocess: bool = False, output=None, **main_kwargs) -> bool:
+    """Run a pipeline step and return success status.
+
+    Steps are imported and their main() called in-process by default, so
+    interpreter startup and module imports are paid once per pipeline run.
+    main_kwargs (such as an already-loaded job description) are only passed
+    to in-process steps; subprocess steps read everything from their args.
+
+    output, if given, is a text stream that receives the step's header,
+    output (including LaTeX output) and status instead of the console, so
+    steps running concurrently never interleave. A subprocess step's output
+    is read from its pipe; an in-process step has sys.stdout and sys.stderr
+    redirected while it runs, so only one in-process step may be captured at
+    a time.
+    """
+    script_path = SCRIPT_DIR / script_name
+    if use_subprocess:
+        cmd = [sys.executable, str(script_path)] + args
+    else:
+        cmd = [script_name] + args
 
-def run_step(script_name: str, args: list, step_name: str) -> bool:
-    """Run a pipeline step and return success status."""
-    script_path = Path(__file__).parent / script_name
-    cmd = [sys.executable, str(script_path)] + args
-
-    print(f"\n{'='*60}")
-    print(f"STEP: {step_name}")
-    print(f"Command: {' '.join(cmd)}")
-    print(f"{'='*60}")
+    print(f"\n{'='*60}\nSTEP: {step_name}\nCommand: {' '.join(cmd)}\n{'='*60}",
+          file=output)
 
-    try:
-        result = subprocess.run(cmd, check=True)
-        print(f"✅ {step_name} completed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ {step_name} failed with exit code {e.returncode}")
+    if use_subprocess:
+        if output is None:
+            exit_code = subprocess.run(cmd).returncode
+        else:
+            # Unbuffered so the step's own prints and LaTeX output keep their order
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                errors="replace", env={**os.environ, "PYTHONUNBUFFERED": "1"})
+            output.write(result.stdout)
+            exit_code = result.returncode
+    else:
+        with contextlib.ExitStack() as stack:
+            if output is not None:
+                stack.enter_context(contextlib.redirect_stdout(output))
+                stack.enter_context(contextlib.redirect_stderr(output))
+            try:
+                module = importlib.import_module(script_path.stem)
+                exit_code = module.main(args, **main_kwargs)
+            except SystemExit as e:
+                # argparse errors and missing-dependency exits
+                exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+
+    return report_step(step_name, exit_code, output)
+
+
+def report_step(step_name: str, exit_code: int, output=None) -> bool:
+    """Print the outcome of a pipeline step and return success status."""
+    if exit_code:
+        print(f"❌ {step_name} failed with exit code {exit_code}", file=output)
         return False
+    print(f"✅ {step_name} completed successfully", file=output)
+    return True
 
 
 def main():
@@ -99,6 +148,11 @@ Examples:
         action="store_true",
         help="Skip LLM calls in step 2 (for testing)"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing cached responses (steps 1 and 2)"
+    )
     parser.add_argument(
         "--max-experiences",
         type=int,
@@ -126,6 +180,11 @@ Examples:
         type=str,
         help="Company name for cover letter (extracted from job description if not provided)"
     )
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="Run each step in a separate Python process instead of in-process"
+    )
 
     args = parser.parse_args()
 
@@ -135,6 +194,9 @@ Examples:
         print(f"Error: Job description file not found: {job_desc_path}")
         return 1
 
+    # Read the job description once and hand it to the in-process steps
+    job_description = job_desc_path.read_text(encoding='utf-8')
+
     # Setup output paths
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -195,8 +257,11 @@ Examples:
         if args.dry_run:
             step1_args.append("--dry-run")
 
+        if args.no_cache:
+            step1_args.append("--no-cache")
+
         success = run_step("step1_relevance_filter.py",
-                           step1_args, "Step 1: LLM-Based Relevance Filtering")
+                           step1_args, "Step 1: LLM-Based Relevance Filtering", args.subprocess)
         if not success:
             return 1
 
@@ -210,8 +275,7 @@ Examples:
             existing_files = list(output_dir.glob(
                 f"{job_name}_step1_filtered_*.json"))
             if existing_files:
-                step2_input = str(sorted(existing_files)
-                                  [-1])  # Use most recent
+                step2_input = str(max(existing_files))  # Use most recent
                 print(f"Using existing step 1 output: {step2_input}")
             else:
                 print(
@@ -230,14 +294,21 @@ Examples:
         if args.dry_run:
             step2_args.append("--dry-run")
 
+        if args.no_cache:
+            step2_args.append("--no-cache")
+
         if args.concise:
             step2_args.append("--concise")
 
         success = run_step("step2_llm_optimize.py",
-                           step2_args, "Step 2: LLM Optimization")
+                           step2_args, "Step 2: LLM Optimization", args.subprocess,
+                           job_description=job_description)
         if not success:
             return 1
 
+    # Steps 3 and 4 are collected here and run together below
+    final_steps = []
+
     # Step 3: PDF Generation
     if "3" in steps_to_run and success:
         # Determine input file for step 3
@@ -248,8 +319,7 @@ Examples:
             existing_files = list(output_dir.glob(
                 f"{job_name}_step2_optimized_*.json"))
             if existing_files:
-                step3_input = str(sorted(existing_files)
-                                  [-1])  # Use most recent
+                step3_input = str(max(existing_files))  # Use most recent
                 print(f"Using existing step 2 output: {step3_input}")
             else:
                 print(
@@ -261,10 +331,8 @@ Examples:
             "--output", final_output
         ]
 
-        success = run_step("step3_generate_pdf.py",
-                           step3_args, "Step 3: PDF Generation")
-        if not success:
-            return 1
+        final_steps.append(("step3_generate_pdf.py",
+                            step3_args, "Step 3: PDF Generation", {}))
 
     # Step 4: Cover Letter Generation (optional)
     if "4" in steps_to_run and success:
@@ -276,8 +344,7 @@ Examples:
             existing_files = list(output_dir.glob(
                 f"{job_name}_step2_optimized_*.json"))
             if existing_files:
-                step4_input = str(sorted(existing_files)
-                                  [-1])  # Use most recent
+                step4_input = str(max(existing_files))  # Use most recent
                 print(
                     f"Using existing step 2 output for cover letter: {step4_input}")
             else:
@@ -300,25 +367,57 @@ Examples:
         if args.dry_run:
             step4_args.append("--dry-run")
 
-        success = run_step("step4_generate_cover_letter.py",
-                           step4_args, "Step 4: Cover Letter Generation")
-        if not success:
-            return 1
+        final_steps.append(("step4_generate_cover_letter.py",
+                            step4_args, "Step 4: Cover Letter Generation",
+                            {"job_description": job_description}))
+
+    # Steps 3 and 4 only depend on step 2 output, so run them concurrently,
+    # each with its output captured so the two steps' logs (and any LaTeX
+    # errors) are printed separately. Capturing an in-process step redirects
+    # sys.stdout, so only the step that takes in-memory arguments (step 4's
+    # job description) runs in-process; the rest run as subprocesses
+    if len(final_steps) > 1:
+        print("\nRunning steps 3 and 4 concurrently...")
+        console = sys.stdout
+        in_process = None if args.subprocess else next(
+            (step for step in final_steps if step[3]), None)
+        with ThreadPoolExecutor(max_workers=len(final_steps)) as executor:
+            outputs = {}
+            for step in final_steps:
+                script_name, step_args, step_name, main_kwargs = step
+                if step is not in_process:
+                    main_kwargs = {}
+                output = io.StringIO()
+                future = executor.submit(
+                    run_step, script_name, step_args, step_name,
+                    use_subprocess=step is not in_process, output=output,
+                    **main_kwargs)
+                outputs[future] = output
+            results = []
+            for future in as_completed(outputs):
+                console.write(outputs[future].getvalue())
+                results.append(future.result())
+        success = all(results)
+    elif final_steps:
+        script_name, step_args, step_name, main_kwargs = final_steps[0]
+        success = run_step(script_name, step_args, step_name,
+                           args.subprocess, **main_kwargs)
+    if not success:
+        return 1
 
-    if success:
-        print(f"\n🎉 Pipeline completed successfully!")
-        print(f"📄 Final resume: {final_output}")
+    print(f"\n🎉 Pipeline completed successfully!")
+    print(f"📄 Final resume: {final_output}")
 
-        if "4" in steps_to_run:
-            print(f"📝 Cover letter: {cover_letter_output}")
+    if "4" in steps_to_run:
+        print(f"📝 Cover letter: {cover_letter_output}")
 
-        # Show intermediate files
-        if step1_output.exists():
-            print(f"📋 Filtered resume: {step1_output}")
-        if step2_output.exists():
-            print(f"✨ Optimized resume: {step2_output}")
+    # Show intermediate files
+    if step1_output.exists():
+        print(f"📋 Filtered resume: {step1_output}")
+    if step2_output.exists():
+        print(f"✨ Optimized resume: {step2_output}")
 
-    return 0 if success else 1
+    return 0
 
 
 if __name__ == "__main__":
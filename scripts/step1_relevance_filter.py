@@ -6,12 +6,13 @@ experiences, projects, and skills from the complete resume data without rewritin
 """
 
 import argparse
+import asyncio
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
-import time
 
 try:
     import openai
@@ -27,363 +28,522 @@ except ImportError:
     print("Missing dependency: python-dotenv. Please run: pip install -r requirements.txt", file=sys.stderr)
     sys.exit(1)
 
+import llm_client
+from llm_client import setup_openai_client, truncate_job_description
+
+
+try:
+    import orjson  # Optional: faster JSON parsing/serialization
+except ImportError:
+    orjson = None
+
+
+def parse_json(text: str) -> Any:
+    """Parse a JSON string."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
 
 def load_json(path: Path) -> dict:
     """Load JSON data from file."""
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+    return parse_json(path.read_bytes())
 
 
 def save_json(data: dict, path: Path) -> None:
-    """Save JSON data to file."""
+    """Save JSON data to file atomically, so a crash never leaves a partial file."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open('w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    if orjson is not None:
+        content = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        content = json.dumps(data, indent=2).encode('utf-8')
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with tmp_path.open('wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# Structured output schema for the experience and project rankers
+RANKING_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ranking",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "order": {"type": "array", "items": {"type": "integer"}},
+            },
+            "required": ["order"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Recognised priority values; anything else is treated as unset
+PRIORITY_LEVELS = frozenset({'high', 'medium', 'low'})
+
+# Skip the LLM when the job description is too short to rank against
+MIN_JOB_DESCRIPTION_CHARS = 50
+# Skip the LLM when selecting would only drop this many items past the limit
+RANK_SKIP_MARGIN = 1
+SKILL_SKIP_MARGIN = 2
+
+# Embedding model used by --skills-mode embed
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+class BatchChatClient:
+    """Collects chat completion requests and submits them as one OpenAI Batch job.
+
+    Requests issued within flush_delay seconds of each other share a batch.
+    Batch jobs are cheaper than interactive calls but may take minutes to
+    hours to complete.
+    """
+
+    def __init__(self, client: openai.AsyncOpenAI, poll_interval: float = 30.0, flush_delay: float = 0.1):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.flush_delay = flush_delay
+        self._pending = []
+        self._flush_task = None
+        self._request_count = 0
+
+    async def create(self, **kwargs):
+        """Queue a chat completion request and wait for its batch result."""
+        future = asyncio.get_running_loop().create_future()
+        self._request_count += 1
+        self._pending.append((f"request-{self._request_count}", kwargs, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+        return await future
+
+    async def _flush(self):
+        await asyncio.sleep(self.flush_delay)
+        pending, self._pending, self._flush_task = self._pending, [], None
+        try:
+            results = await self._run_batch(pending)
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(e)
+            return
+        for custom_id, _, future in pending:
+            if custom_id in results:
+                future.set_result(results[custom_id])
+            else:
+                future.set_exception(
+                    RuntimeError(f"No batch result for {custom_id}"))
+
+    async def _run_batch(self, requests: List[Tuple[str, Dict, Any]]) -> Dict[str, Any]:
+        lines = [
+            json.dumps({"custom_id": custom_id, "method": "POST",
+                        "url": "/v1/chat/completions", "body": body})
+            for custom_id, body, _ in requests
+        ]
+        batch_file = await self.client.files.create(
+            file=("step1_batch.jsonl", "\n".join(lines).encode('utf-8')),
+            purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h")
+        print(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(self.poll_interval)
+            batch = await self.client.batches.retrieve(batch.id)
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+
+        results = {}
+        if batch.output_file_id:
+            output = await self.client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                record = parse_json(line)
+                response = record.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[record["custom_id"]] = openai.types.chat.ChatCompletion.model_validate(
+                        response["body"])
+        return results
+
+
+async def create_chat_completion(client: openai.AsyncOpenAI, **kwargs):
+    """Create a chat completion through the shared client helpers.
+
+    Batched requests must all be queued before the batch is submitted, so they
+    bypass the rate-limited call.
+    """
+    send = client.create if isinstance(client, BatchChatClient) else None
+    return await llm_client.create_chat_completion(client, send=send, **kwargs)
+
+
+# Bullets longer than this are shortened in ranking prompts; the gist is enough to rank
+MAX_BULLET_CHARS = 200
+
+
+def shorten_bullet(bullet: str) -> str:
+    """Trim a bullet to MAX_BULLET_CHARS, marking the cut with an ellipsis."""
+    if len(bullet) <= MAX_BULLET_CHARS:
+        return bullet
+    return bullet[:MAX_BULLET_CHARS].rstrip() + "…"
+
+
+def summarize_experience(exp: Dict) -> str:
+    """Describe an experience for the ranking prompt."""
+    return (
+        f"Company: {exp.get('company', 'Unknown')}\n"
+        f"Role: {exp.get('role', 'Unknown')}\n"
+        f"Duration: {exp.get('start_date', '')} - {exp.get('end_date', '')} [Priority: {exp.get('priority', 'unset')}]\n"
+        f"Key achievements:\n"
+        + ''.join(f"• {shorten_bullet(bullet)}\n" for bullet in exp.get('bullets', []))
+    )
 
 
-def setup_openai_client(api_key: str = None) -> openai.OpenAI:
-    """Setup OpenAI client with API key."""
-    if api_key:
-        return openai.OpenAI(api_key=api_key)
-    elif os.getenv('OPENAI_API_KEY'):
-        return openai.OpenAI()
-    else:
-        raise ValueError(
-            "OpenAI API key not provided. Set OPENAI_API_KEY environment variable or pass --api-key")
+def summarize_project(proj: Dict) -> str:
+    """Describe a project for the ranking prompt."""
+    return (
+        f"Name: {proj.get('name', 'Unknown')}\n"
+        f"Technologies: {', '.join(proj.get('tech', []))} [Priority: {proj.get('priority', 'unset')}]\n"
+        f"Description:\n"
+        + ''.join(f"• {shorten_bullet(bullet)}\n" for bullet in proj.get('bullets', []))
+    )
 
 
-def llm_rank_experiences(client: openai.OpenAI, experiences: List[Dict], job_description: str, max_count: int) -> List[Dict]:
-    """Use LLM to rank and select the most relevant experiences, respecting priority levels."""
+# Per-kind wording for the ranking prompt
+RANKING_PROMPTS = {
+    "experience": {
+        "label": "Experience",
+        "noun": "experiences",
+        "title": "work experiences",
+        "criteria": """1. Technical skills alignment
+2. Industry relevance  
+3. Role responsibilities match
+4. Seniority level appropriateness
+5. Transferable skills""",
+        "example": "[1, 3, 2]",
+    },
+    "project": {
+        "label": "Project",
+        "noun": "projects",
+        "title": "projects",
+        "criteria": """1. Technology stack alignment
+2. Project complexity and scope
+3. Relevant problem-solving approaches
+4. Demonstrable skills
+5. Industry relevance""",
+        "example": "[2, 1]",
+    },
+}
 
-    if len(experiences) <= max_count:
-        return experiences
 
-    # Separate experiences by priority
-    high_priority = [
-        exp for exp in experiences if exp.get('priority') == 'high']
-    medium_priority = [
-        exp for exp in experiences if exp.get('priority') == 'medium']
-    low_priority = [exp for exp in experiences if exp.get('priority') == 'low']
-    no_priority = [exp for exp in experiences if 'priority' not in exp]
+async def _llm_rank(client: openai.AsyncOpenAI, items: List[Dict], job_description: str, max_count: int,
+                    kind: str, summarize) -> List[Dict]:
+    """Use LLM to rank and select the most relevant items of one kind, respecting priority levels."""
 
-    # Always include all high priority experiences
-    selected_experiences = high_priority.copy()
-    remaining_slots = max_count - len(selected_experiences)
+    if len(items) <= max_count:
+        return items
+
+    wording = RANKING_PROMPTS[kind]
+    noun = wording["noun"]
+
+    # Separate items by priority in a single pass
+    buckets = {'high': [], 'medium': [], 'low': [], 'none': []}
+    for item in items:
+        priority = item.get('priority')
+        buckets[priority if priority in PRIORITY_LEVELS else 'none'].append(item)
+    high_priority, medium_priority, low_priority, no_priority = (
+        buckets['high'], buckets['medium'], buckets['low'], buckets['none'])
+
+    # Always include all high priority items
+    selected_items = high_priority.copy()
+    remaining_slots = max_count - len(selected_items)
 
     if remaining_slots <= 0:
-        # If high priority experiences exceed max_count, return first max_count high priority ones
-        return selected_experiences[:max_count]
+        # If high priority items exceed max_count, return first max_count high priority ones
+        return selected_items[:max_count]
 
-    # Combine medium, low, and no-priority experiences for LLM ranking
-    remaining_experiences = medium_priority + low_priority + no_priority
+    # Combine medium, low, and no-priority items for LLM ranking
+    remaining_items = medium_priority + low_priority + no_priority
 
-    if not remaining_experiences:
-        return selected_experiences
+    if not remaining_items:
+        return selected_items
 
-    if len(remaining_experiences) <= remaining_slots:
-        # If we have space for all remaining experiences
-        return selected_experiences + remaining_experiences
+    if len(remaining_items) <= remaining_slots:
+        # If we have space for all remaining items
+        return selected_items + remaining_items
 
-    # Prepare experience summaries for the LLM (only for remaining experiences)
-    exp_summaries = []
-    for i, exp in enumerate(remaining_experiences):
-        priority_note = f" [Priority: {exp.get('priority', 'unset')}]"
-        summary = f"Experience {i+1}:\n"
-        summary += f"Company: {exp.get('company', 'Unknown')}\n"
-        summary += f"Role: {exp.get('role', 'Unknown')}\n"
-        summary += f"Duration: {exp.get('start_date', '')} - {exp.get('end_date', '')}{priority_note}\n"
-        summary += f"Key achievements:\n"
-        for bullet in exp.get('bullets', []):
-            summary += f"• {bullet}\n"
-        exp_summaries.append(summary)
+    if (len(remaining_items) <= remaining_slots + RANK_SKIP_MARGIN
+            or len(job_description.strip()) < MIN_JOB_DESCRIPTION_CHARS):
+        # Not worth an LLM call; keep the highest priority remaining items
+        return selected_items + remaining_items[:remaining_slots]
 
-    prompt = f"""You are a career counselor helping to select the most relevant work experiences for a specific job application.
+    # Number the remaining items (1-based) for the LLM to refer to
+    by_id = dict(enumerate(remaining_items, start=1))
 
-NOTE: High priority experiences have already been selected. You are choosing from the remaining experiences.
+    # Prepare item summaries for the LLM (only for remaining items)
+    summaries = [f"{wording['label']} {i}:\n{summarize(item)}"
+                 for i, item in by_id.items()]
+
+    prompt = f"""You are a career counselor helping to select the most relevant {wording['title']} for a specific job application.
+
+NOTE: High priority {noun} have already been selected. You are choosing from the remaining {noun}.
 
 JOB DESCRIPTION:
 {job_description}
 
-AVAILABLE EXPERIENCES (remaining {remaining_slots} slots):
-{chr(10).join(exp_summaries)}
-
-TASK: Select the {remaining_slots} most relevant experiences for this job application. Consider:
-1. Technical skills alignment
-2. Industry relevance  
-3. Role responsibilities match
-4. Seniority level appropriateness
-5. Transferable skills
-6. Priority level (medium priority experiences are preferred over low priority when relevance is similar)
+AVAILABLE {noun.upper()} (remaining {remaining_slots} slots):
+{chr(10).join(summaries)}
 
-Return ONLY a JSON array with the experience numbers (1-based) in order of relevance.
-Example format: [1, 3, 2]
+TASK: Select the {remaining_slots} most relevant {noun} for this job application. Consider:
+{wording['criteria']}
+6. Priority level (medium priority {noun} are preferred over low priority when relevance is similar)
 
-Do not include any explanation, just the JSON array."""
+Return a JSON object whose "order" array holds the {kind} numbers (1-based) in order of relevance.
+Example format: {{"order": {wording['example']}}}"""
 
     try:
-        response = client.chat.completions.create(
+        response = await create_chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": "You are a professional career counselor who selects the most relevant work experiences for job applications. Always respond with only a JSON array of numbers."},
+                {"role": "system", "content": f"You are a professional career counselor who selects the most relevant {wording['title']} for job applications."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.1,
-            max_tokens=100
+            max_tokens=100,
+            response_format=RANKING_RESPONSE_FORMAT,
+            validate=lambda r: isinstance(
+                parse_json(r.choices[0].message.content).get("order"), list)
         )
-
-        result_text = response.choices[0].message.content.strip()
-
-        # Parse the JSON response
-        try:
-            selected_indices = json.loads(result_text)
-            if not isinstance(selected_indices, list):
-                raise ValueError("Response is not a list")
-
-            # Convert to 0-based indices and validate (for remaining_experiences)
-            llm_selected = []
-            for idx in selected_indices[:remaining_slots]:
-                if isinstance(idx, int) and 1 <= idx <= len(remaining_experiences):
-                    llm_selected.append(remaining_experiences[idx - 1])
-
-            # If we don't have enough, fill with remaining experiences
-            if len(llm_selected) < remaining_slots:
-                remaining = [
-                    exp for exp in remaining_experiences if exp not in llm_selected]
-                llm_selected.extend(
-                    remaining[:remaining_slots - len(llm_selected)])
-
-            # Combine high priority + LLM selected
-            final_selection = selected_experiences + llm_selected
-            return final_selection[:max_count]
-
-        except (json.JSONDecodeError, ValueError) as e:
-            print(
-                f"Warning: Could not parse LLM response for experiences: {e}")
-            print(f"Response was: {result_text}")
-            # Fallback: high priority + first N remaining
-            fallback_selection = selected_experiences + \
-                remaining_experiences[:remaining_slots]
-            return fallback_selection[:max_count]
+        selected_indices = parse_json(
+            response.choices[0].message.content)["order"]
 
     except Exception as e:
-        print(f"Error using LLM for experience ranking: {e}")
+        print(f"Error using LLM for {kind} ranking: {e}")
         # Fallback: high priority + first N remaining
-        fallback_selection = selected_experiences + \
-            remaining_experiences[:remaining_slots]
+        fallback_selection = selected_items + remaining_items[:remaining_slots]
         return fallback_selection[:max_count]
 
+    # Map the returned numbers back to items, ignoring unknown and repeated ones
+    llm_selected = []
+    seen = set()
+    for idx in selected_indices:
+        if isinstance(idx, int) and idx in by_id and idx not in seen:
+            seen.add(idx)
+            llm_selected.append(by_id[idx])
+    llm_selected = llm_selected[:remaining_slots]
+
+    # If we don't have enough, fill with remaining items
+    if len(llm_selected) < remaining_slots:
+        chosen_ids = {id(item) for item in llm_selected}
+        unchosen = [
+            item for item in remaining_items if id(item) not in chosen_ids]
+        llm_selected.extend(
+            unchosen[:remaining_slots - len(llm_selected)])
+
+    # Combine high priority + LLM selected
+    final_selection = selected_items + llm_selected
+    return final_selection[:max_count]
+
+
+async def llm_rank_experiences(client: openai.AsyncOpenAI, experiences: List[Dict], job_description: str, max_count: int) -> List[Dict]:
+    """Use LLM to rank and select the most relevant experiences, respecting priority levels."""
+    return await _llm_rank(client, experiences, job_description, max_count,
+                           "experience", summarize_experience)
 
-def llm_rank_projects(client: openai.OpenAI, projects: List[Dict], job_description: str, max_count: int) -> List[Dict]:
-    """Use LLM to rank and select the most relevant projects, respecting priority levels."""
 
-    if len(projects) <= max_count:
-        return projects
+async def llm_rank_projects(client: openai.AsyncOpenAI, projects: List[Dict], job_description: str, max_count: int) -> List[Dict]:
+    """Use LLM to rank and select the most relevant projects, respecting priority levels."""
+    return await _llm_rank(client, projects, job_description, max_count,
+                           "project", summarize_project)
 
-    # Separate projects by priority
-    high_priority = [
-        proj for proj in projects if proj.get('priority') == 'high']
-    medium_priority = [
-        proj for proj in projects if proj.get('priority') == 'medium']
-    low_priority = [proj for proj in projects if proj.get('priority') == 'low']
-    no_priority = [proj for proj in projects if 'priority' not in proj]
 
-    # Always include all high priority projects
-    selected_projects = high_priority.copy()
-    remaining_slots = max_count - len(selected_projects)
+async def llm_filter_skills(client: openai.AsyncOpenAI, skills: Dict[str, Any], job_description: str, max_per_category: int) -> Dict[str, Any]:
+    """Use a single LLM call to filter all skill categories by relevance to job description."""
 
-    if remaining_slots <= 0:
-        # If high priority projects exceed max_count, return first max_count high priority ones
-        return selected_projects[:max_count]
-
-    # Combine medium, low, and no-priority projects for LLM ranking
-    remaining_projects = medium_priority + low_priority + no_priority
+    filtered_skills = {}
+    to_filter = []
 
-    if not remaining_projects:
-        return selected_projects
+    for category in ['languages', 'technologies', 'concepts']:
+        if category not in skills or not isinstance(skills[category], list):
+            continue
 
-    if len(remaining_projects) <= remaining_slots:
-        # If we have space for all remaining projects
-        return selected_projects + remaining_projects
+        skill_list = skills[category]
+        if (len(skill_list) <= max_per_category + SKILL_SKIP_MARGIN
+                or len(job_description.strip()) < MIN_JOB_DESCRIPTION_CHARS):
+            # Not worth an LLM call; keep the first N skills
+            filtered_skills[category] = skill_list[:max_per_category]
+        else:
+            filtered_skills[category] = skill_list
+            to_filter.append(category)
 
-    # Prepare project summaries for the LLM (only for remaining projects)
-    proj_summaries = []
-    for i, proj in enumerate(remaining_projects):
-        priority_note = f" [Priority: {proj.get('priority', 'unset')}]"
-        summary = f"Project {i+1}:\n"
-        summary += f"Name: {proj.get('name', 'Unknown')}\n"
-        summary += f"Technologies: {', '.join(proj.get('tech', []))}{priority_note}\n"
-        summary += f"Description:\n"
-        for bullet in proj.get('bullets', []):
-            summary += f"• {bullet}\n"
-        proj_summaries.append(summary)
+    if not to_filter:
+        # Every category is within the limit or not worth filtering
+        return filtered_skills
 
-    prompt = f"""You are a career counselor helping to select the most relevant projects for a specific job application.
+    category_sections = "\n".join(
+        f"{category.upper()}: {', '.join(skills[category])}" for category in to_filter)
 
-NOTE: High priority projects have already been selected. You are choosing from the remaining projects.
+    prompt = f"""You are a career counselor helping to select the most relevant skills for a specific job application.
 
 JOB DESCRIPTION:
 {job_description}
 
-AVAILABLE PROJECTS (remaining {remaining_slots} slots):
-{chr(10).join(proj_summaries)}
+AVAILABLE SKILLS BY CATEGORY:
+{category_sections}
 
-TASK: Select the {remaining_slots} most relevant projects for this job application. Consider:
-1. Technology stack alignment
-2. Project complexity and scope
-3. Relevant problem-solving approaches
-4. Demonstrable skills
-5. Industry relevance
-6. Priority level (medium priority projects are preferred over low priority when relevance is similar)
-
-Return ONLY a JSON array with the project numbers (1-based) in order of relevance.
-Example format: [2, 1]
+TASK: For each category above, select the {max_per_category} most relevant skills for this job application. Consider:
+1. Direct mentions in the job description
+2. Related/complementary technologies
+3. Industry standard requirements
+4. Transferable skills value
 
-Do not include any explanation, just the JSON array."""
+Return a JSON object mapping each category name ({', '.join(to_filter)}) to an array of the exact skill names from that category's list above.
+Example format: {{"languages": ["Python", "JavaScript"], "technologies": ["React", "Docker"]}}"""
+
+    # Constrain each category to its own skill names
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "skill_selection",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    category: {"type": "array", "items": {
+                        "type": "string", "enum": skills[category]}}
+                    for category in to_filter
+                },
+                "required": to_filter,
+                "additionalProperties": False,
+            },
+        },
+    }
 
     try:
-        response = client.chat.completions.create(
+        response = await create_chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": "You are a professional career counselor who selects the most relevant projects for job applications. Always respond with only a JSON array of numbers."},
+                {"role": "system", "content": "You are a professional career counselor who selects the most relevant skills for job applications."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.1,
-            max_tokens=100
+            max_tokens=400,
+            response_format=response_format,
+            validate=lambda r: all(
+                isinstance(parse_json(r.choices[0].message.content).get(category), list)
+                for category in to_filter)
         )
+        selected = parse_json(response.choices[0].message.content)
 
-        result_text = response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Error using LLM for skills filtering: {e}")
+        # Fallback to first N skills
+        for category in to_filter:
+            filtered_skills[category] = skills[category][:max_per_category]
+        return filtered_skills
 
-        # Parse the JSON response
-        try:
-            selected_indices = json.loads(result_text)
-            if not isinstance(selected_indices, list):
-                raise ValueError("Response is not a list")
-
-            # Convert to 0-based indices and validate (for remaining_projects)
-            llm_selected = []
-            for idx in selected_indices[:remaining_slots]:
-                if isinstance(idx, int) and 1 <= idx <= len(remaining_projects):
-                    llm_selected.append(remaining_projects[idx - 1])
-
-            # If we don't have enough, fill with remaining projects
-            if len(llm_selected) < remaining_slots:
-                remaining = [
-                    proj for proj in remaining_projects if proj not in llm_selected]
-                llm_selected.extend(
-                    remaining[:remaining_slots - len(llm_selected)])
-
-            # Combine high priority + LLM selected
-            final_selection = selected_projects + llm_selected
-            return final_selection[:max_count]
-
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Warning: Could not parse LLM response for projects: {e}")
-            print(f"Response was: {result_text}")
-            # Fallback: high priority + first N remaining
-            fallback_selection = selected_projects + \
-                remaining_projects[:remaining_slots]
-            return fallback_selection[:max_count]
+    for category in to_filter:
+        skill_list = skills[category]
+        selected_skills = selected.get(category)
+        if not isinstance(selected_skills, list):
+            print(f"Warning: LLM response has no list for {category}")
+            selected_skills = []
+
+        # Validate that selected skills are in the original list, once each
+        known_skills = set(skill_list)
+        valid_skills = []
+        seen = set()
+        for skill in selected_skills:
+            if isinstance(skill, str) and skill in known_skills and skill not in seen:
+                seen.add(skill)
+                valid_skills.append(skill)
+
+        # If we don't have enough, fill with remaining skills
+        if len(valid_skills) < max_per_category:
+            remaining = [
+                skill for skill in skill_list if skill not in seen]
+            valid_skills.extend(
+                remaining[:max_per_category - len(valid_skills)])
+
+        filtered_skills[category] = valid_skills[:max_per_category]
 
-    except Exception as e:
-        print(f"Error using LLM for project ranking: {e}")
-        # Fallback: high priority + first N remaining
-        fallback_selection = selected_projects + \
-            remaining_projects[:remaining_slots]
-        return fallback_selection[:max_count]
+    return filtered_skills
 
 
-def llm_filter_skills(client: openai.OpenAI, skills: Dict[str, Any], job_description: str, max_per_category: int) -> Dict[str, Any]:
-    """Use LLM to filter skills by relevance to job description."""
+async def embed_filter_skills(client: openai.AsyncOpenAI, skills: Dict[str, Any], job_description: str, max_per_category: int) -> Dict[str, Any]:
+    """Filter skills by cosine similarity between skill and job description embeddings."""
 
     filtered_skills = {}
+    to_filter = []
 
     for category in ['languages', 'technologies', 'concepts']:
         if category not in skills or not isinstance(skills[category], list):
             continue
 
-        skill_list = skills[category]
-        if len(skill_list) <= max_per_category:
-            # No need to filter if we have fewer skills than the limit
-            filtered_skills[category] = skill_list
-            continue
+        filtered_skills[category] = skills[category]
+        if len(skills[category]) > max_per_category:
+            to_filter.append(category)
 
-        prompt = f"""You are a career counselor helping to select the most relevant skills for a specific job application.
+    if not to_filter:
+        # No need to filter if every category is within the limit
+        return filtered_skills
 
-JOB DESCRIPTION:
-{job_description}
+    if isinstance(client, BatchChatClient):
+        # Embeddings are a single cheap call; send it directly
+        client = client.client
 
-SKILL CATEGORY: {category.title()}
-AVAILABLE SKILLS: {', '.join(skill_list)}
+    # Embed the job description and every skill to filter in one request
+    inputs = [job_description] + \
+        [skill for category in to_filter for skill in skills[category]]
 
-TASK: Select the {max_per_category} most relevant {category} for this job application. Consider:
-1. Direct mentions in the job description
-2. Related/complementary technologies
-3. Industry standard requirements
-4. Transferable skills value
-
-Return ONLY a JSON array with the exact skill names from the list above.
-Example format: ["Python", "JavaScript", "React"]
-
-Do not include any explanation, just the JSON array."""
-
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": f"You are a professional career counselor who selects the most relevant {category} for job applications. Always respond with only a JSON array of skill names."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=200
-            )
-
-            result_text = response.choices[0].message.content.strip()
-
-            # Clean up any markdown formatting
-            if result_text.startswith('```json'):
-                result_text = result_text.replace(
-                    '```json', '').replace('```', '').strip()
-            elif result_text.startswith('```'):
-                result_text = result_text.replace('```', '').strip()
-
-            # Parse the JSON response
-            try:
-                selected_skills = json.loads(result_text)
-                if not isinstance(selected_skills, list):
-                    raise ValueError("Response is not a list")
-
-                # Validate that selected skills are in the original list
-                valid_skills = [
-                    skill for skill in selected_skills if skill in skill_list]
-
-                # If we don't have enough, fill with remaining skills
-                if len(valid_skills) < max_per_category:
-                    remaining = [
-                        skill for skill in skill_list if skill not in valid_skills]
-                    valid_skills.extend(
-                        remaining[:max_per_category - len(valid_skills)])
-
-                filtered_skills[category] = valid_skills[:max_per_category]
-
-            except (json.JSONDecodeError, ValueError) as e:
-                print(
-                    f"Warning: Could not parse LLM response for {category}: {e}")
-                print(f"Response was: {result_text}")
-                # Fallback to first N skills
-                filtered_skills[category] = skill_list[:max_per_category]
+    try:
+        response = await llm_client.create_embeddings(
+            client, model=EMBEDDING_MODEL, input=inputs)
+        vectors = [item.embedding for item in sorted(
+            response.data, key=lambda item: item.index)]
+    except Exception as e:
+        print(f"Error using embeddings for skills filtering: {e}")
+        # Fallback to first N skills
+        for category in to_filter:
+            filtered_skills[category] = skills[category][:max_per_category]
+        return filtered_skills
+
+    def normalize(vector: List[float]) -> List[float]:
+        norm = sum(x * x for x in vector) ** 0.5 or 1.0
+        return [x / norm for x in vector]
+
+    job_vector = normalize(vectors[0])
+    skill_vectors = iter(vectors[1:])
+
+    for category in to_filter:
+        scored = []
+        for skill in skills[category]:
+            skill_vector = normalize(next(skill_vectors))
+            scored.append(
+                (sum(a * b for a, b in zip(job_vector, skill_vector)), skill))
+        # Highest similarity first; ties keep the original order
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        filtered_skills[category] = [
+            skill for _, skill in scored[:max_per_category]]
 
-        except Exception as e:
-            print(f"Error using LLM for {category} filtering: {e}")
-            # Fallback to first N skills
-            filtered_skills[category] = skill_list[:max_per_category]
+    return filtered_skills
 
-        # Small delay to respect rate limits
-        time.sleep(0.3)
 
-    return filtered_skills
+async def rank_resume_content(client: openai.AsyncOpenAI, experiences: List[Dict], projects: List[Dict], skills: Dict[str, Any], job_description: str, args: argparse.Namespace) -> Tuple[List[Dict], List[Dict], Dict[str, Any]]:
+    """Run the experience, project and skill rankings concurrently."""
+    return await asyncio.gather(
+        llm_rank_experiences(
+            client, experiences, job_description, args.max_experiences),
+        llm_rank_projects(client, projects, job_description, args.max_projects),
+        (embed_filter_skills if args.skills_mode == "embed" else llm_filter_skills)(
+            client, skills, job_description, args.max_skills_per_category),
+    )
 
 
-def main():
+def main(argv: list = None):
     parser = argparse.ArgumentParser(
         description="Filter resume content based on job description relevance using LLM"
     )
@@ -422,6 +582,18 @@ def main():
         default=8,
         help="Maximum skills per category to include"
     )
+    parser.add_argument(
+        "--skills-mode",
+        choices=["llm", "embed"],
+        default="llm",
+        help="Rank skills with a chat completion (llm) or by embedding similarity to the job description (embed)"
+    )
+    parser.add_argument(
+        "--max-jd-tokens",
+        type=int,
+        default=1500,
+        help="Truncate the job description to this many tokens before sending it to the LLM"
+    )
     parser.add_argument(
         "--api-key",
         type=str,
@@ -432,8 +604,20 @@ def main():
         action="store_true",
         help="Skip LLM calls and use simple selection (for testing)"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing cached responses"
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit the LLM calls as one OpenAI Batch job (cheaper, but may take hours)"
+    )
+
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
+    llm_client.use_response_cache = not args.no_cache
 
     # Load job description
     job_desc_path = Path(args.job_description)
@@ -445,12 +629,17 @@ def main():
         job_description = f.read()
 
     print(f"Loaded job description from: {job_desc_path}")
+    job_description = truncate_job_description(
+        job_description, args.max_jd_tokens)
 
     # Setup OpenAI client (unless dry run)
     if not args.dry_run:
         try:
             client = setup_openai_client(args.api_key)
             print("OpenAI client initialized successfully")
+            if args.batch:
+                client = BatchChatClient(client)
+                print("Batch mode: LLM calls will be submitted as one batch job")
         except ValueError as e:
             print(f"Error: {e}")
             return 1
@@ -461,86 +650,92 @@ def main():
     # Load source resume data
     source_dir = Path(args.source_dir)
 
-    # Load individual JSON files
+    # Load individual JSON files concurrently (None when missing)
+    source_files = ["personal_info.json", "education.json",
+                    "experience.json", "projects.json", "skills.json"]
+
+    def load_source(filename: str):
+        path = source_dir / filename
+        return load_json(path) if path.exists() else None
+
+    with ThreadPoolExecutor(max_workers=len(source_files)) as executor:
+        loaded = dict(zip(source_files, executor.map(load_source, source_files)))
+
     resume_data = {}
 
-    # Load personal info (always included)
-    personal_info_path = source_dir / "personal_info.json"
-    if personal_info_path.exists():
-        personal_data = load_json(personal_info_path)
+    # Personal info (always included)
+    personal_data = loaded["personal_info.json"]
+    if personal_data is not None:
         resume_data["personal_info"] = personal_data
 
-    # Load education (always included)
-    education_path = source_dir / "education.json"
-    if education_path.exists():
-        education_data = load_json(education_path)
+    # Education (always included)
+    education_data = loaded["education.json"]
+    if education_data is not None:
         resume_data["education"] = education_data.get(
             "education", education_data)
 
-    # Load and filter experiences
-    experience_path = source_dir / "experience.json"
-    if experience_path.exists():
-        experience_data = load_json(experience_path)
+    # Experiences, projects and skills (None when not available)
+    experiences = None
+    experience_data = loaded["experience.json"]
+    if experience_data is not None:
         experiences = experience_data.get("experience", experience_data)
-        if isinstance(experiences, list):
-            if args.dry_run or client is None:
-                # Simple selection for dry run
-                filtered_experiences = experiences[:args.max_experiences]
-            else:
-                print(
-                    f"Using LLM to select {args.max_experiences} most relevant experiences from {len(experiences)} available...")
-                filtered_experiences = llm_rank_experiences(
-                    client, experiences, job_description, args.max_experiences)
+        if not isinstance(experiences, list):
+            experiences = None
 
-            resume_data["experience"] = filtered_experiences
-            print(
-                f"Selected experiences: {len(experiences)} -> {len(filtered_experiences)}")
-            for exp in filtered_experiences:
-                print(
-                    f"  - {exp.get('company', 'Unknown')}: {exp.get('role', 'Unknown')}")
-
-    # Load and filter projects
-    projects_path = source_dir / "projects.json"
-    if projects_path.exists():
-        projects_data = load_json(projects_path)
+    projects = None
+    projects_data = loaded["projects.json"]
+    if projects_data is not None:
         projects = projects_data.get("projects", projects_data)
-        if isinstance(projects, list):
-            if args.dry_run or client is None:
-                # Simple selection for dry run
-                filtered_projects = projects[:args.max_projects]
-            else:
-                print(
-                    f"Using LLM to select {args.max_projects} most relevant projects from {len(projects)} available...")
-                filtered_projects = llm_rank_projects(
-                    client, projects, job_description, args.max_projects)
+        if not isinstance(projects, list):
+            projects = None
 
-            resume_data["projects"] = filtered_projects
-            print(
-                f"Selected projects: {len(projects)} -> {len(filtered_projects)}")
-            for proj in filtered_projects:
-                print(f"  - {proj.get('name', 'Unknown')}")
-
-    # Load and filter skills
-    skills_path = source_dir / "skills.json"
-    if skills_path.exists():
-        skills_data = load_json(skills_path)
+    skills = None
+    skills_data = loaded["skills.json"]
+    if skills_data is not None:
         # Handle both nested and flat skill structures
         if "languages" in skills_data:
             skills = skills_data
         else:
             skills = skills_data.get("skills", skills_data)
 
-        if args.dry_run or client is None:
-            # Simple selection for dry run
-            filtered_skills = {}
-            for category in ['languages', 'technologies', 'concepts']:
-                if category in skills and isinstance(skills[category], list):
-                    filtered_skills[category] = skills[category][:args.max_skills_per_category]
-        else:
+    # Filter experiences, projects and skills
+    if args.dry_run or client is None:
+        # Simple selection for dry run
+        filtered_experiences = (experiences or [])[:args.max_experiences]
+        filtered_projects = (projects or [])[:args.max_projects]
+        filtered_skills = {}
+        for category in ['languages', 'technologies', 'concepts']:
+            if category in (skills or {}) and isinstance(skills[category], list):
+                filtered_skills[category] = skills[category][:args.max_skills_per_category]
+    else:
+        if experiences is not None:
+            print(
+                f"Using LLM to select {args.max_experiences} most relevant experiences from {len(experiences)} available...")
+        if projects is not None:
+            print(
+                f"Using LLM to select {args.max_projects} most relevant projects from {len(projects)} available...")
+        if skills is not None:
             print(f"Using LLM to filter skills by relevance...")
-            filtered_skills = llm_filter_skills(
-                client, skills, job_description, args.max_skills_per_category)
+        filtered_experiences, filtered_projects, filtered_skills = asyncio.run(
+            rank_resume_content(client, experiences or [], projects or [],
+                                skills or {}, job_description, args))
+
+    if experiences is not None:
+        resume_data["experience"] = filtered_experiences
+        print(
+            f"Selected experiences: {len(experiences)} -> {len(filtered_experiences)}")
+        for exp in filtered_experiences:
+            print(
+                f"  - {exp.get('company', 'Unknown')}: {exp.get('role', 'Unknown')}")
+
+    if projects is not None:
+        resume_data["projects"] = filtered_projects
+        print(
+            f"Selected projects: {len(projects)} -> {len(filtered_projects)}")
+        for proj in filtered_projects:
+            print(f"  - {proj.get('name', 'Unknown')}")
 
+    if skills is not None:
         resume_data["skills"] = filtered_skills
 
         for category, skill_list in filtered_skills.items():
@@ -6,12 +6,12 @@ while preserving the original meaning and structure.
 """
 
 import argparse
+import asyncio
 import json
-import os
+import re
 import sys
 from pathlib import Path
 from typing import Dict, List, Any
-import time
 
 try:
     import openai
@@ -27,56 +27,69 @@ except ImportError:
     print("Missing dependency: python-dotenv. Please run: pip install -r requirements.txt", file=sys.stderr)
     sys.exit(1)
 
+import llm_client
+from llm_client import (create_chat_completion, prompt_cache_key, setup_openai_client,
+                        truncate_job_description)
+
+
+try:
+    import orjson  # Optional: faster JSON parsing/serialization
+except ImportError:
+    orjson = None
+
+
+def parse_json(text: str) -> Any:
+    """Parse a JSON string."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
 
 def load_json(path: Path) -> dict:
     """Load JSON data from file."""
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+    return parse_json(path.read_bytes())
 
 
 def save_json(data: dict, path: Path) -> None:
     """Save JSON data to file."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open('w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
-
-
-def setup_openai_client(api_key: str = None) -> openai.OpenAI:
-    """Setup OpenAI client with API key."""
-    if api_key:
-        return openai.OpenAI(api_key=api_key)
-    elif os.getenv('OPENAI_API_KEY'):
-        return openai.OpenAI()
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
     else:
-        raise ValueError(
-            "OpenAI API key not provided. Set OPENAI_API_KEY environment variable or pass --api-key")
+        with path.open('w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
 
 
-def optimize_bullet_points(client: openai.OpenAI, bullets: List[str], job_description: str, context: str, concise: bool = False, priority: str = None) -> List[str]:
-    """Optimize bullet points using OpenAI API."""
+# A non-empty line starting with a bullet symbol; captures the stripped text
+BULLET_PATTERN = re.compile(r'^[^\S\n]*[•*-][^\S\n]*(\S.*?)[^\S\n]*$', re.M)
 
-    priority_note = ""
-    if priority:
-        priority_note = f"\n\nNOTE: This is a {priority} priority item. "
-        if priority == "high":
-            priority_note += "This should always be included and represents a key strength, so ensure optimization maintains strong impact."
-        elif priority == "medium":
-            priority_note += "This is moderately important and should be optimized for relevance to the job description."
-        elif priority == "low":
-            priority_note += "This is lower priority and should be optimized to maximize relevance to justify its inclusion."
 
-    prompt = f"""You are helping optimize resume bullet points for a specific job application. 
+def describe_priority(priority: str = None) -> str:
+    """Explain to the LLM how an item's priority should shape its optimization."""
+    if not priority:
+        return ""
+    note = f"This is a {priority} priority item. "
+    if priority == "high":
+        note += "This should always be included and represents a key strength, so ensure optimization maintains strong impact."
+    elif priority == "medium":
+        note += "This is moderately important and should be optimized for relevance to the job description."
+    elif priority == "low":
+        note += "This is lower priority and should be optimized to maximize relevance to justify its inclusion."
+    return note
 
-JOB DESCRIPTION:
-{job_description}
 
-CONTEXT: {context}{priority_note}
+def build_system_prompt(job_description: str, concise: bool = False) -> str:
+    """Build the system prompt shared by every optimization request in a run.
 
-ORIGINAL BULLET POINTS:
-{chr(10).join(f"• {bullet}" for bullet in bullets)}
+    Static instructions and the job description come first so every call in a
+    run shares the same prompt prefix, which OpenAI caches server-side.
+    """
+    return f"""You are a professional resume writer who makes subtle, targeted improvements to align resume content with job requirements.
+
+You are helping optimize resume bullet points for a specific job application.
 
 INSTRUCTIONS:
-1. Make MINOR tweaks to better align these bullet points with the job description
+1. Make MINOR tweaks to better align the bullet points with the job description
 2. KEEP BULLET POINTS CONCISE - aim for 1-2 lines maximum per bullet point
 3. DO NOT rewrite the bullet points completely - preserve the original meaning and achievements
 4. You may:
@@ -93,30 +106,49 @@ INSTRUCTIONS:
 CRITICAL: Keep each bullet point under {"80 characters" if concise else "120 characters"} when possible. Focus on impact over verbosity.
 {"EXTRA CONCISE MODE: Remove all unnecessary words. Use strong action verbs. Aim for maximum impact in minimum words." if concise else ""}
 
+JOB DESCRIPTION:
+{job_description}"""
+
+
+async def optimize_bullet_points(client: openai.AsyncOpenAI, bullets: List[str], job_description: str, context: str, concise: bool = False, priority: str = None, system_prompt: str = None) -> List[str]:
+    """Optimize bullet points using OpenAI API.
+
+    system_prompt is the output of build_system_prompt; pass it when
+    optimizing several entries so it is only built once.
+    """
+    if system_prompt is None:
+        system_prompt = build_system_prompt(job_description, concise)
+
+    note = describe_priority(priority)
+    priority_note = f"\n\nNOTE: {note}" if note else ""
+
+    prompt = f"""CONTEXT: {context}{priority_note}
+
+ORIGINAL BULLET POINTS:
+{chr(10).join(f"• {bullet}" for bullet in bullets)}
+
 Return ONLY the optimized bullet points in the same format, one per line with bullet symbols."""
 
     try:
-        response = client.chat.completions.create(
+        response = await create_chat_completion(
+            client,
             model="gpt-4o-mini",  # Using the more cost-effective model
             messages=[
-                {"role": "system", "content": "You are a professional resume writer who makes subtle, targeted improvements to align resume content with job requirements."},
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,  # Lower temperature for more consistent results
-            max_tokens=1000
+            max_tokens=1000,
+            extra_body={"prompt_cache_key": prompt_cache_key(job_description)},
+            # Don't cache a wrong bullet count, so the next run asks again
+            validate=lambda r: len(BULLET_PATTERN.findall(
+                r.choices[0].message.content.strip())) == len(bullets)
         )
 
         optimized_text = response.choices[0].message.content.strip()
 
         # Parse the response back into a list
-        optimized_bullets = []
-        for line in optimized_text.split('\n'):
-            line = line.strip()
-            if line and (line.startswith('•') or line.startswith('-') or line.startswith('*')):
-                # Remove bullet symbol and clean up
-                bullet = line[1:].strip()
-                if bullet:
-                    optimized_bullets.append(bullet)
+        optimized_bullets = BULLET_PATTERN.findall(optimized_text)
 
         # Fallback: if parsing failed, return original
         if len(optimized_bullets) != len(bullets):
@@ -131,75 +163,160 @@ Return ONLY the optimized bullet points in the same format, one per line with bu
         return bullets  # Return original on error
 
 
-def optimize_experience_entry(client: openai.OpenAI, experience: Dict[str, Any], job_description: str, concise: bool = False) -> Dict[str, Any]:
-    """Optimize a single experience entry."""
-    optimized_exp = experience.copy()
-
-    if 'bullets' in experience and isinstance(experience['bullets'], list):
-        context = f"Experience at {experience.get('company', 'Unknown')} as {experience.get('role', 'Unknown')}"
-        priority = experience.get('priority')
-        optimized_bullets = optimize_bullet_points(
-            client,
-            experience['bullets'],
-            job_description,
-            context,
-            concise,
-            priority
-        )
-        optimized_exp['bullets'] = optimized_bullets
-
-    return optimized_exp
-
+def build_bullet_groups(resume_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Collect the bullet points of every experience and project for optimization."""
+    groups = []
+
+    experiences = resume_data.get('experience')
+    if isinstance(experiences, list):
+        for i, exp in enumerate(experiences):
+            if isinstance(exp.get('bullets'), list):
+                groups.append({
+                    "id": f"experience_{i}",
+                    "context": f"Experience at {exp.get('company', 'Unknown')} as {exp.get('role', 'Unknown')}",
+                    "priority": exp.get('priority'),
+                    "bullets": exp['bullets'],
+                })
+
+    projects = resume_data.get('projects')
+    if isinstance(projects, list):
+        for i, proj in enumerate(projects):
+            if isinstance(proj.get('bullets'), list):
+                groups.append({
+                    "id": f"project_{i}",
+                    "context": f"Project: {proj.get('name', 'Unknown')} using {', '.join(proj.get('tech', []))}",
+                    "priority": proj.get('priority'),
+                    "bullets": proj['bullets'],
+                })
+
+    return groups
+
+
+def usable_bullets(bullets: Any, original: List[str]) -> bool:
+    """Whether the LLM's bullets for a group are non-empty strings matching the original count."""
+    return (isinstance(bullets, list) and len(bullets) == len(original)
+            and all(isinstance(bullet, str) and bullet.strip() for bullet in bullets))
+
+
+async def optimize_all(client: openai.AsyncOpenAI, groups: List[Dict[str, Any]], job_description: str, concise: bool = False, system_prompt: str = None) -> Dict[str, List[str]]:
+    """Optimize every bullet group with a single LLM call.
+
+    Returns the optimized bullets keyed by group id. Groups the LLM got wrong
+    (for example by changing the number of bullets) are left out.
+    """
+    if not groups:
+        return {}
+    if system_prompt is None:
+        system_prompt = build_system_prompt(job_description, concise)
+
+    entries = [
+        {"id": group["id"], "context": group["context"],
+         "note": describe_priority(group["priority"]), "bullets": group["bullets"]}
+        for group in groups
+    ]
+
+    prompt = f"""ENTRIES:
+{json.dumps(entries, indent=2, ensure_ascii=False)}
+
+Optimize the bullet points of every entry, following each entry's context and note.
+Return a JSON object mapping each entry id to its optimized bullet points, in the same order and with the same number of bullets as the original."""
+
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "optimized_bullets",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    group["id"]: {"type": "array", "items": {"type": "string"}}
+                    for group in groups
+                },
+                "required": [group["id"] for group in groups],
+                "additionalProperties": False,
+            },
+        },
+    }
 
-def optimize_project_entry(client: openai.OpenAI, project: Dict[str, Any], job_description: str, concise: bool = False) -> Dict[str, Any]:
-    """Optimize a single project entry."""
-    optimized_proj = project.copy()
-
-    if 'bullets' in project and isinstance(project['bullets'], list):
-        context = f"Project: {project.get('name', 'Unknown')} using {', '.join(project.get('tech', []))}"
-        priority = project.get('priority')
-        optimized_bullets = optimize_bullet_points(
+    try:
+        response = await create_chat_completion(
             client,
-            project['bullets'],
-            job_description,
-            context,
-            concise,
-            priority
+            model="gpt-4o-mini",  # Using the more cost-effective model
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,  # Lower temperature for more consistent results
+            max_tokens=min(1000 * len(groups), 16000),
+            response_format=response_format,
+            extra_body={"prompt_cache_key": prompt_cache_key(job_description)},
+            # Only cache answers where every group is usable, so a bad one is
+            # not replayed (and its groups retried) on every run
+            validate=lambda r: all(
+                usable_bullets(parse_json(r.choices[0].message.content).get(group["id"]), group["bullets"])
+                for group in groups)
         )
-        optimized_proj['bullets'] = optimized_bullets
-
-    return optimized_proj
+        optimized = parse_json(response.choices[0].message.content)
+    except Exception as e:
+        print(f"Error optimizing bullet points: {e}")
+        return {}
+
+    results = {}
+    for group in groups:
+        bullets = optimized.get(group["id"])
+        if usable_bullets(bullets, group["bullets"]):
+            results[group["id"]] = [bullet.strip() for bullet in bullets]
+        else:
+            print(
+                f"Warning: LLM returned unusable bullets for {group['id']}. Retrying it on its own.")
+    return results
 
 
-def optimize_resume_content(client: openai.OpenAI, resume_data: Dict[str, Any], job_description: str, concise: bool = False) -> Dict[str, Any]:
+async def optimize_resume_content(client: openai.AsyncOpenAI, resume_data: Dict[str, Any], job_description: str, concise: bool = False) -> Dict[str, Any]:
     """Optimize entire resume content using LLM."""
     optimized_resume = resume_data.copy()
 
     print("Optimizing resume content with LLM...")
 
-    # Optimize experiences
-    if 'experience' in resume_data and isinstance(resume_data['experience'], list):
-        optimized_experiences = []
-        for i, exp in enumerate(resume_data['experience']):
-            print(
-                f"  Optimizing experience {i+1}/{len(resume_data['experience'])}: {exp.get('company', 'Unknown')}")
-            optimized_exp = optimize_experience_entry(
-                client, exp, job_description, concise)
-            optimized_experiences.append(optimized_exp)
-            time.sleep(0.5)  # Rate limiting
-        optimized_resume['experience'] = optimized_experiences
-
-    # Optimize projects
-    if 'projects' in resume_data and isinstance(resume_data['projects'], list):
-        optimized_projects = []
-        for i, proj in enumerate(resume_data['projects']):
-            print(
-                f"  Optimizing project {i+1}/{len(resume_data['projects'])}: {proj.get('name', 'Unknown')}")
-            optimized_proj = optimize_project_entry(
-                client, proj, job_description, concise)
-            optimized_projects.append(optimized_proj)
-            time.sleep(0.5)  # Rate limiting
-        optimized_resume['projects'] = optimized_projects
+    for i, exp in enumerate(resume_data.get('experience') or []):
+        print(
+            f"  Optimizing experience {i+1}/{len(resume_data['experience'])}: {exp.get('company', 'Unknown')}")
+    for i, proj in enumerate(resume_data.get('projects') or []):
+        print(
+            f"  Optimizing project {i+1}/{len(resume_data['projects'])}: {proj.get('name', 'Unknown')}")
+
+    groups = build_bullet_groups(resume_data)
+
+    # The system prompt only depends on the job, so build it once for all calls
+    system_prompt = build_system_prompt(job_description, concise)
+
+    # Optimize all groups in one request, then retry any the LLM got wrong
+    # individually and concurrently
+    results = await optimize_all(
+        client, groups, job_description, concise, system_prompt)
+    missing = [group for group in groups if group["id"] not in results]
+    retried = await asyncio.gather(*(
+        optimize_bullet_points(client, group["bullets"], job_description,
+                               group["context"], concise, group["priority"],
+                               system_prompt)
+        for group in missing
+    ))
+    results.update(
+        (group["id"], bullets) for group, bullets in zip(missing, retried))
+
+    # Stitch the optimized bullets back into their entries; entries whose
+    # bullets did not change are shared with the input rather than copied
+    for section, prefix in (('experience', 'experience_'), ('projects', 'project_')):
+        entries = resume_data.get(section)
+        if not isinstance(entries, list):
+            continue
+        optimized_entries = []
+        for i, entry in enumerate(entries):
+            bullets = results.get(f"{prefix}{i}")
+            if bullets is not None and bullets != entry['bullets']:
+                entry = {**entry, 'bullets': bullets}
+            optimized_entries.append(entry)
+        optimized_resume[section] = optimized_entries
 
     # Keep other sections unchanged (personal_info, education, skills)
     # These typically don't need LLM optimization
@@ -207,7 +324,9 @@ def optimize_resume_content(client: openai.OpenAI, resume_data: Dict[str, Any],
     return optimized_resume
 
 
-def main():
+def main(argv: list = None, job_description: str = None):
+    # job_description may be passed by an in-process caller that has already
+    # read the file, in which case it is not read again
     parser = argparse.ArgumentParser(
         description="Optimize resume content using LLM based on job description"
     )
@@ -242,8 +361,21 @@ def main():
         action="store_true",
         help="Generate more concise bullet points (shorter, punchier)"
     )
+    parser.add_argument(
+        "--max-jd-tokens",
+        type=int,
+        default=1500,
+        help="Truncate the job description to this many tokens before sending it to the LLM"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing cached responses"
+    )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    llm_client.use_response_cache = not args.no_cache
 
     # Load filtered resume
     filtered_resume_path = Path(args.filtered_resume)
@@ -255,12 +387,15 @@ def main():
 
     # Load job description
     job_desc_path = Path(args.job_description)
-    if not job_desc_path.exists():
-        print(f"Error: Job description file not found: {job_desc_path}")
-        return 1
+    if job_description is None:
+        if not job_desc_path.exists():
+            print(f"Error: Job description file not found: {job_desc_path}")
+            return 1
 
-    with job_desc_path.open('r', encoding='utf-8') as f:
-        job_description = f.read()
+        with job_desc_path.open('r', encoding='utf-8') as f:
+            job_description = f.read()
+    job_description = truncate_job_description(
+        job_description, args.max_jd_tokens)
 
     if args.dry_run:
         print("Dry run mode: Skipping LLM optimization")
@@ -274,8 +409,8 @@ def main():
             return 1
 
         # Optimize resume content
-        optimized_resume = optimize_resume_content(
-            client, resume_data, job_description, args.concise)
+        optimized_resume = asyncio.run(optimize_resume_content(
+            client, resume_data, job_description, args.concise))
 
     # Save optimized resume
     output_path = Path(args.output)
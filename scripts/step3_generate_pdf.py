@@ -5,12 +5,11 @@ Wrapper around the existing build_resume.py script for the 3-step pipeline.
 """
 
 import argparse
-import subprocess
 import sys
 from pathlib import Path
 
 
-def main():
+def main(argv: list = None):
     parser = argparse.ArgumentParser(
         description="Generate PDF resume from optimized JSON (Step 3 of pipeline)"
     )
@@ -26,7 +25,7 @@ def main():
         help="Output path for generated PDF"
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Validate input file exists
     optimized_resume_path = Path(args.optimized_resume)
@@ -36,38 +35,30 @@ def main():
         return 1
 
     # Get the directory containing this script
-    script_dir = Path(__file__).parent
+    script_dir = Path(__file__).resolve().parent
     build_script = script_dir / "build_resume.py"
 
     if not build_script.exists():
         print(f"Error: build_resume.py not found at: {build_script}")
         return 1
 
-    # Call the existing build_resume.py script
-    cmd = [
-        sys.executable,
-        str(build_script),
-        str(optimized_resume_path),
-        "--out", args.output
-    ]
+    # Run build_resume.py in-process instead of starting another interpreter
+    if str(script_dir) not in sys.path:
+        sys.path.insert(0, str(script_dir))
+    import build_resume
+
+    build_args = [str(optimized_resume_path), "--out", args.output]
 
     print(f"Generating PDF: {args.output}")
-    print(f"Command: {' '.join(cmd)}")
+    print(f"Command: build_resume.py {' '.join(build_args)}")
 
     try:
-        result = subprocess.run(
-            cmd, check=True, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print("Warnings:", result.stderr)
+        build_resume.main(build_args)
         print(f"\nPDF generated successfully: {args.output}")
         return 0
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
+        # Any LaTeX output has already been written to stderr by build_resume
         print(f"Error generating PDF: {e}")
-        if e.stdout:
-            print("STDOUT:", e.stdout)
-        if e.stderr:
-            print("STDERR:", e.stderr)
         return 1
 
 
@@ -7,12 +7,12 @@ and job description, then renders it using LaTeX template.
 
 import argparse
 import json
-import os
+import re
+import shutil
 import sys
 from pathlib import Path
 from typing import Dict, Any
 import subprocess
-import tempfile
 
 try:
     import openai
@@ -28,29 +28,66 @@ except ImportError:
     print("Missing dependency: python-dotenv. Please run: pip install -r requirements.txt", file=sys.stderr)
     sys.exit(1)
 
+from llm_client import (create_chat_completion_sync, prompt_cache_key, setup_openai_client,
+                        truncate_job_description)
+
+
+try:
+    import orjson  # Optional: faster JSON parsing/serialization
+except ImportError:
+    orjson = None
+
 try:
     import chevron
+    from chevron.tokenizer import tokenize
 except ImportError:
     print("Missing dependency: chevron. Please run: pip install chevron",
           file=sys.stderr)
     sys.exit(1)
 
 
-def load_json(path: Path) -> dict:
-    """Load JSON data from file."""
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+HAS_LATEXMK = shutil.which("latexmk") is not None
 
+# Persistent LaTeX build directories, one per output file, kept between runs
+# for incremental builds
+BUILD_DIR = Path(__file__).resolve().parents[1] / ".build" / "cover-letter"
+
+# Markdown code fence wrapped around a JSON response
+FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$')
 
-def setup_openai_client(api_key: str = None) -> openai.OpenAI:
-    """Setup OpenAI client with API key."""
-    if api_key:
-        return openai.OpenAI(api_key=api_key)
-    elif os.getenv('OPENAI_API_KEY'):
-        return openai.OpenAI()
-    else:
-        raise ValueError(
-            "OpenAI API key not provided. Set OPENAI_API_KEY environment variable or pass --api-key")
+
+def parse_json(text: str) -> Any:
+    """Parse a JSON string."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def load_json(path: Path) -> dict:
+    """Load JSON data from file."""
+    return parse_json(path.read_bytes())
+
+
+def read_streamed_json(stream) -> str:
+    """Collect a streamed chat completion that should contain a JSON object.
+
+    Stops reading as soon as the response clearly is not JSON (it starts with
+    neither an object nor a markdown fence), instead of waiting for the rest.
+    """
+    parts = []
+    checked = False
+    for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        parts.append(chunk.choices[0].delta.content)
+        if not checked:
+            head = ''.join(parts).lstrip()
+            if head:
+                checked = True
+                if head[0] not in '{`':
+                    stream.close()
+                    break
+    return ''.join(parts)
 
 
 def generate_cover_letter_content(client: openai.OpenAI, resume_data: Dict[str, Any], job_description: str, company_name: str = None) -> Dict[str, str]:
@@ -63,40 +100,42 @@ def generate_cover_letter_content(client: openai.OpenAI, resume_data: Dict[str,
     skills = resume_data.get('skills', {})
 
     # Build resume summary for context
-    resume_summary = f"Name: {personal_info.get('name', 'Unknown')}\n"
+    summary_parts = [f"Name: {personal_info.get('name', 'Unknown')}\n"]
 
     if experiences:
-        resume_summary += "\nKey Experiences:\n"
-        for exp in experiences[:2]:  # Top 2 experiences
-            resume_summary += f"- {exp.get('role', 'Unknown')} at {exp.get('company', 'Unknown')}\n"
-            for bullet in exp.get('bullets', [])[:2]:  # Top 2 bullets per experience
-                resume_summary += f"  • {bullet}\n"
+        summary_parts.append("\nKey Experiences:\n")
+        # Top 2 experiences, top 2 bullets per experience
+        summary_parts.extend(
+            f"- {exp.get('role', 'Unknown')} at {exp.get('company', 'Unknown')}\n"
+            + ''.join(f"  • {bullet}\n" for bullet in exp.get('bullets', [])[:2])
+            for exp in experiences[:2]
+        )
 
     if projects:
-        resume_summary += "\nKey Projects:\n"
-        for proj in projects[:2]:  # Top 2 projects
-            resume_summary += f"- {proj.get('name', 'Unknown')}\n"
-            for bullet in proj.get('bullets', [])[:1]:  # Top bullet per project
-                resume_summary += f"  • {bullet}\n"
+        summary_parts.append("\nKey Projects:\n")
+        # Top 2 projects, top bullet per project
+        summary_parts.extend(
+            f"- {proj.get('name', 'Unknown')}\n"
+            + ''.join(f"  • {bullet}\n" for bullet in proj.get('bullets', [])[:1])
+            for proj in projects[:2]
+        )
+
+    resume_summary = ''.join(summary_parts)
 
     # Determine company name from job description if not provided
     if not company_name:
         company_name = "the company"
 
-    prompt = f"""You are a professional career counselor writing a compelling cover letter. 
+    # Static instructions and the job description come first so they form a
+    # stable prompt prefix that OpenAI can cache server-side
+    system_prompt = f"""You are a professional career counselor who writes compelling, personalized cover letters. Always respond with valid JSON only.
 
-JOB DESCRIPTION:
-{job_description}
-
-CANDIDATE'S RESUME SUMMARY:
-{resume_summary}
-
-TASK: Write a professional cover letter that:
-1. Shows genuine interest in the specific role and company
-2. Highlights 2-3 most relevant experiences/achievements from the resume
-3. Demonstrates clear alignment between candidate's skills and job requirements
-4. Shows enthusiasm and personality while remaining professional
-5. Is concise (3-4 paragraphs maximum)
+TASK: Write a professional cover letter for the candidate (resume summary in the user message). The letter should:
+1. Show genuine interest in the specific role and company
+2. Highlight 2-3 most relevant experiences/achievements from the resume
+3. Demonstrate clear alignment between candidate's skills and job requirements
+4. Show enthusiasm and personality while remaining professional
+5. Be concise (3-4 paragraphs maximum)
 
 STRUCTURE:
 - Opening paragraph: Express interest and briefly mention most relevant qualification
@@ -120,31 +159,37 @@ Return a JSON object with the following structure:
   "recipient_name": "Hiring Manager"
 }}
 
-Do not include any explanation, just the JSON object."""
+Do not include any explanation, just the JSON object.
+
+JOB DESCRIPTION:
+{job_description}"""
+
+    prompt = f"""CANDIDATE'S RESUME SUMMARY:
+{resume_summary}"""
 
     try:
-        response = client.chat.completions.create(
+        stream = create_chat_completion_sync(
+            client,
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": "You are a professional career counselor who writes compelling, personalized cover letters. Always respond with valid JSON only."},
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7,  # Slightly higher for more personality
-            max_tokens=1000
+            max_tokens=1000,
+            stream=True,
+            # Route calls for the same job description to the same prompt cache
+            extra_body={"prompt_cache_key": prompt_cache_key(job_description)}
         )
 
-        result_text = response.choices[0].message.content.strip()
+        result_text = read_streamed_json(stream).strip()
 
         # Clean up any markdown formatting
-        if result_text.startswith('```json'):
-            result_text = result_text.replace(
-                '```json', '').replace('```', '').strip()
-        elif result_text.startswith('```'):
-            result_text = result_text.replace('```', '').strip()
+        result_text = FENCE_PATTERN.sub('', result_text)
 
         # Parse the JSON response
         try:
-            cover_letter_data = json.loads(result_text)
+            cover_letter_data = parse_json(result_text)
 
             # Validate required fields
             required_fields = ['intro', 'body_paragraphs',
@@ -192,13 +237,26 @@ Do not include any explanation, just the JSON object."""
         }
 
 
+# Tokenized templates keyed by (path, mtime)
+_TEMPLATE_CACHE = {}
+
+
+def load_template(template_path: Path) -> list:
+    """Read and tokenize a Mustache template, reusing it until the file changes."""
+    key = (template_path, template_path.stat().st_mtime_ns)
+    tokens = _TEMPLATE_CACHE.get(key)
+    if tokens is None:
+        tokens = list(tokenize(template_path.read_text(encoding='utf-8')))
+        _TEMPLATE_CACHE[key] = tokens
+    return tokens
+
+
 def render_cover_letter_latex(cover_letter_data: Dict[str, str], personal_info: Dict[str, Any], template_path: Path, output_path: Path) -> bool:
     """Render cover letter using LaTeX template."""
 
     try:
-        # Read template
-        with template_path.open('r', encoding='utf-8') as f:
-            template_content = f.read()
+        # Read template (tokenized once per template version)
+        template_tokens = load_template(template_path)
 
         # Prepare template data
         template_data = {
@@ -212,55 +270,61 @@ def render_cover_letter_latex(cover_letter_data: Dict[str, str], personal_info:
         }
 
         # Render template
-        rendered_content = chevron.render(template_content, template_data)
-
-        # Write to temporary .tex file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.tex', delete=False, encoding='utf-8') as temp_file:
-            temp_file.write(rendered_content)
-            temp_tex_path = Path(temp_file.name)
-
-        try:
-            # Compile LaTeX to PDF
-            output_dir = output_path.parent
-            output_dir.mkdir(parents=True, exist_ok=True)
-
-            # Run pdflatex
-            result = subprocess.run([
-                'pdflatex',
-                '-interaction=nonstopmode',
-                '-output-directory', str(output_dir),
-                '-jobname', output_path.stem,
-                str(temp_tex_path)
-            ], capture_output=True, text=True)
-
-            if result.returncode != 0:
-                print(f"LaTeX compilation failed:")
-                print(result.stdout)
-                print(result.stderr)
-                return False
-
-            print(f"Cover letter generated successfully: {output_path}")
-            return True
-
-        finally:
-            # Clean up temporary file
-            temp_tex_path.unlink(missing_ok=True)
-
-            # Clean up LaTeX auxiliary files
-            aux_files = [
-                output_dir / f"{output_path.stem}.aux",
-                output_dir / f"{output_path.stem}.log",
-                output_dir / f"{output_path.stem}.out"
-            ]
-            for aux_file in aux_files:
-                aux_file.unlink(missing_ok=True)
+        rendered_content = chevron.render(template_tokens, template_data)
+
+        # Write to a fixed path in a persistent build directory, so latexmk
+        # can tell from its file database when nothing has changed; each
+        # output file gets its own directory so concurrent runs don't collide
+        build_dir = BUILD_DIR / output_path.stem
+        build_dir.mkdir(parents=True, exist_ok=True)
+        tex_path = build_dir / "cover_letter.tex"
+        if not tex_path.exists() or tex_path.read_text(encoding='utf-8') != rendered_content:
+            tex_path.write_text(rendered_content, encoding='utf-8')
+
+        # Compile LaTeX to PDF
+        log_path = build_dir / "cover_letter.log"
+        job_args = ['-interaction=nonstopmode',
+                    '-output-directory', str(build_dir),
+                    str(tex_path)]
+
+        # Prefer latexmk, which skips the build when the inputs are unchanged and
+        # only reruns when cross-references change; the console output is
+        # discarded since the .log has the same content
+        if HAS_LATEXMK:
+            result = subprocess.run(
+                ['latexmk', '-pdf', '-recorder', '-halt-on-error'] + job_args,
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        else:
+            # Fallback to pdflatex, with a second pass only when LaTeX asks for one
+            result = subprocess.run(
+                ['pdflatex'] + job_args,
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if (result.returncode == 0 and log_path.exists()
+                    and "Rerun to get" in log_path.read_text(encoding='utf-8', errors='replace')):
+                result = subprocess.run(
+                    ['pdflatex'] + job_args,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+        if result.returncode != 0:
+            print(f"LaTeX compilation failed:")
+            if log_path.exists():
+                print(log_path.read_text(encoding='utf-8', errors='replace'))
+            print(result.stderr)
+            return False
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(build_dir / "cover_letter.pdf", output_path)
+        print(f"Cover letter generated successfully: {output_path}")
+        return True
 
     except Exception as e:
         print(f"Error rendering cover letter: {e}")
         return False
 
 
-def main():
+def main(argv: list = None, job_description: str = None):
+    # job_description may be passed by an in-process caller that has already
+    # read the file, in which case it is not read again
     parser = argparse.ArgumentParser(
         description="Generate personalized cover letter using optimized resume and job description"
     )
@@ -296,13 +360,19 @@ def main():
         type=str,
         help="OpenAI API key (or set OPENAI_API_KEY environment variable)"
     )
+    parser.add_argument(
+        "--max-jd-tokens",
+        type=int,
+        default=1500,
+        help="Truncate the job description to this many tokens before sending it to the LLM"
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Skip LLM calls and generate basic template (for testing)"
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Load optimized resume
     resume_path = Path(args.optimized_resume)
@@ -314,12 +384,15 @@ def main():
 
     # Load job description
     job_desc_path = Path(args.job_description)
-    if not job_desc_path.exists():
-        print(f"Error: Job description file not found: {job_desc_path}")
-        return 1
+    if job_description is None:
+        if not job_desc_path.exists():
+            print(f"Error: Job description file not found: {job_desc_path}")
+            return 1
 
-    with job_desc_path.open('r', encoding='utf-8') as f:
-        job_description = f.read()
+        with job_desc_path.open('r', encoding='utf-8') as f:
+            job_description = f.read()
+    job_description = truncate_job_description(
+        job_description, args.max_jd_tokens)
 
     # Check template
     template_path = Path(args.template)
@@ -347,7 +420,7 @@ def main():
     else:
         # Setup OpenAI client
         try:
-            client = setup_openai_client(args.api_key)
+            client = setup_openai_client(args.api_key, use_async=False)
         except ValueError as e:
             print(f"Error: {e}")
             return 1